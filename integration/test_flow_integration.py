@@ -97,6 +97,22 @@ def test_join_with_http():
     assert termination_result == 200 * 7
 
 
+def test_join_with_http_by_key():
+    controller = build_flow([
+        Source(),
+        Map(lambda x: x + 1),
+        Filter(lambda x: x < 8),
+        JoinWithHttp(lambda _: HttpRequest('GET', 'https://google.com', ''), lambda _, response: response.status, max_in_flight_by_key=4),
+        Reduce(0, lambda x, y: x + y)
+    ]).run()
+    for i in range(10):
+        controller.emit(i, key=i % 3)
+
+    controller.terminate()
+    termination_result = controller.await_termination()
+    assert termination_result == 200 * 7
+
+
 def test_write_to_v3io_stream():
     stream_path = f'bigdata/test_write_to_v3io_stream/{int(time.time_ns() / 1000)}/'
     asyncio.run(SetupStream().setup(stream_path))
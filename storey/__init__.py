@@ -3,6 +3,6 @@ __version__ = '0.1.0'
 from .flow import (  # noqa: F401
     Filter, FlatMap, Flow, FlowError, JoinWithV3IOTable, JoinWithHttp, Map, Reduce, Source, NeedsV3ioAccess,
     MapWithState, WriteToV3IOStream, ReadCSV, Complete, AsyncSource, Choice,
-    HttpRequest, HttpResponse, Event,
+    HttpRequest, HttpResponse, Event, ConcurrentMap, MapInExecutor, PartitionByKey,
     build_flow
 )
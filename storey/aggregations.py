@@ -1,5 +1,4 @@
 import asyncio
-import copy
 from datetime import datetime
 
 from .aggregation_utils import is_raw_aggregate, get_virtual_aggregation_func, get_dependant_aggregates
@@ -38,6 +37,9 @@ class AggregateByKey(Flow):
             else:
                 raise TypeError(f'key is expected to be either a callable or string but got {type(key)}')
 
+    def _outputs_owned_events(self):
+        return True
+
     async def _do(self, event):
         if event == _termination_obj:
             self._terminate_worker = True
@@ -68,7 +70,7 @@ class AggregateByKey(Flow):
     async def _emit_event(self, key, event):
         features = self._aggregates_store.get_features(key, event.time)
         features = self._augmentation_fn(event.body, features)
-        new_event = copy.copy(event)
+        new_event = event._clone()
         new_event.key = key
         new_event.body = features
         await self._do_downstream(new_event)
@@ -1,9 +1,12 @@
 import asyncio
 import base64
+import collections
 import copy
 import csv
 import json
+import multiprocessing
 import os
+import pickle
 import queue
 import re
 import threading
@@ -17,6 +20,55 @@ import aiohttp
 _termination_obj = object()
 
 
+class _ResumedCoroutine:
+    def __init__(self, coro, yielded):
+        self._coro = coro
+        self._yielded = yielded
+
+    def __await__(self):
+        to_yield = self._yielded
+        while True:
+            try:
+                sent = yield to_yield
+            except GeneratorExit:
+                self._coro.close()
+                raise
+            except BaseException as ex:
+                try:
+                    to_yield = self._coro.throw(ex)
+                except StopIteration as stop:
+                    return stop.value
+            else:
+                try:
+                    to_yield = self._coro.send(sent)
+                except StopIteration as stop:
+                    return stop.value
+
+
+async def _await_resumed(coro, yielded):
+    return await _ResumedCoroutine(coro, yielded)
+
+
+# Runs a coroutine inline until it first suspends. Returns None if it completed synchronously, or a task that finishes it otherwise.
+def _start_eagerly(coro):
+    try:
+        yielded = coro.send(None)
+    except StopIteration:
+        return None
+    return asyncio.get_running_loop().create_task(_await_resumed(coro, yielded))
+
+
+# Runs the given coroutines one after the other, only spawning tasks for those that actually suspend.
+async def _broadcast(coros):
+    tasks = []
+    for coro in coros:
+        task = _start_eagerly(coro)
+        if task:
+            tasks.append(task)
+    for task in tasks:
+        await task
+
+
 class FlowError(Exception):
     pass
 
@@ -30,15 +82,35 @@ class Flow:
         self._outlets = []
         self._full_event = full_event
         self._termination_result_fn = termination_result_fn
+        # Whether no other step holds on to the events this step receives, so that it may modify them in place.
+        # Computed when the flow is run, and None until then.
+        self._owns_input = None
 
     def to(self, outlet):
         self._outlets.append(outlet)
         return outlet
 
     def run(self):
+        hands_off_owned_events = self._hands_off_owned_events()
+        for outlet in self._outlets:
+            outlet._set_owns_input(hands_off_owned_events)
         for outlet in self._outlets:
             outlet.run()
 
+    # A step that is reached from several upstream steps only owns its input if all of them hand off owned events.
+    def _set_owns_input(self, owns_input):
+        if self._owns_input is None:
+            self._owns_input = owns_input
+        else:
+            self._owns_input = self._owns_input and owns_input
+
+    def _hands_off_owned_events(self):
+        return len(self._outlets) == 1 and self._outputs_owned_events()
+
+    # Whether the events this step passes downstream are not referenced by anything else. Conservatively false unless a step knows better.
+    def _outputs_owned_events(self):
+        return False
+
     async def _do(self, event):
         raise NotImplementedError
 
@@ -50,26 +122,46 @@ class Flow:
             for i in range(1, len(self._outlets)):
                 termination_result = self._termination_result_fn(termination_result, await self._outlets[i]._do(_termination_obj))
             return termination_result
-        tasks = []
-        for i in range(len(self._outlets)):
-            tasks.append(asyncio.get_running_loop().create_task(self._outlets[i]._do(event)))
-        for task in tasks:
-            await task
+        if len(self._outlets) == 1:
+            await self._outlets[0]._do(event)
+            return
+        await _broadcast(outlet._do(event) for outlet in self._outlets)
+
+    # Batches never contain _termination_obj, which is always sent on its own through _do.
+    async def _do_batch(self, events):
+        for event in events:
+            await self._do(event)
+
+    async def _do_downstream_batch(self, events):
+        if not self._outlets or not events:
+            return
+        if len(self._outlets) == 1:
+            await self._outlets[0]._do_batch(events)
+            return
+        await _broadcast(outlet._do_batch(events) for outlet in self._outlets)
 
     def _get_safe_event_or_body(self, event):
         if self._full_event:
-            new_event = copy.copy(event)
-            return new_event
+            if self._owns_input:
+                return event
+            return event._clone()
         else:
             return event.body
 
     def _user_fn_output_to_event(self, event, fn_result):
         if self._full_event:
             return fn_result
+        elif self._owns_input:
+            event.body = fn_result
+            return event
         else:
-            mapped_event = copy.copy(event)
-            mapped_event.body = fn_result
-            return mapped_event
+            return self._copy_with_body(event, fn_result)
+
+    @staticmethod
+    def _copy_with_body(event, body):
+        mapped_event = event._clone()
+        mapped_event.body = body
+        return mapped_event
 
 
 class Choice(Flow):
@@ -84,6 +176,10 @@ class Choice(Flow):
             self._outlets.append(default)
         self._default = default
 
+    # Every event is passed to a single outlet.
+    def _hands_off_owned_events(self):
+        return bool(self._owns_input)
+
     async def _do(self, event):
         if not self._outlets or event is _termination_obj:
             return await super()._do_downstream(event)
@@ -100,16 +196,72 @@ class Choice(Flow):
 
 
 class Event:
+    __slots__ = ('body', '_id', 'key', '_time', 'headers', 'method', 'path', 'content_type', '_awaitable_result', '_origin')
+
+    # id and time are generated lazily, the first time they are read.
     def __init__(self, body, id=None, key=None, time=None, headers=None, method=None, path='/', content_type=None, awaitable_result=None):
         self.body = body
-        self.id = id or uuid.uuid4().hex
+        self._id = id or None
         self.key = key
-        self.time = time or datetime.now(timezone.utc)
+        self._time = time or None
         self.headers = headers
         self.method = method
         self.path = path
         self.content_type = content_type
         self._awaitable_result = awaitable_result
+        self._origin = None
+
+    @property
+    def id(self):
+        if self._id is None:
+            if self._origin is not None:
+                self._id = self._origin.id
+            else:
+                self._id = uuid.uuid4().hex
+            self._release_origin()
+        return self._id
+
+    @id.setter
+    def id(self, id):
+        self._id = id
+
+    @property
+    def time(self):
+        if self._time is None:
+            if self._origin is not None:
+                self._time = self._origin.time
+            else:
+                self._time = datetime.now(timezone.utc)
+            self._release_origin()
+        return self._time
+
+    @time.setter
+    def time(self, time):
+        self._time = time
+
+    def _release_origin(self):
+        if self._id is not None and self._time is not None:
+            self._origin = None
+
+    # A shallow copy. A copy whose id or time have not been generated yet resolves them through the original, so both agree.
+    def _clone(self):
+        event = Event.__new__(Event)
+        event.body = self.body
+        event._id = self._id
+        event.key = self.key
+        event._time = self._time
+        event.headers = self.headers
+        event.method = self.method
+        event.path = self.path
+        event.content_type = self.content_type
+        event._awaitable_result = self._awaitable_result
+        if self._id is None or self._time is None:
+            event._origin = self
+        else:
+            event._origin = None
+        return event
+
+    __copy__ = _clone
 
 
 class AwaitableResult:
@@ -126,22 +278,82 @@ class AwaitableResult:
         pass
 
 
+class BatchAwaitableResult:
+    def __init__(self, size):
+        self._results = [None] * size
+        self._remaining = size
+        self._q = queue.Queue(1)
+        if size == 0:
+            self._q.put(self._results)
+
+    def await_result(self):
+        return self._q.get()
+
+    def _set_result_at(self, index, element):
+        self._results[index] = element
+        self._remaining -= 1
+        if self._remaining == 0:
+            self._q.put(self._results)
+
+    def _set_error(self, ex):
+        pass
+
+
+# Lets steps such as Complete set the result of a single event that is part of a batch.
+class _BatchAwaitableResultSlot:
+    def __init__(self, batch_awaitable_result, index):
+        self._batch_awaitable_result = batch_awaitable_result
+        self._index = index
+
+    def _set_result(self, element):
+        return self._batch_awaitable_result._set_result_at(self._index, element)
+
+    def _set_error(self, ex):
+        return self._batch_awaitable_result._set_error(ex)
+
+
+def _build_event(element, key, event_time):
+    if isinstance(element, Event):
+        # The flow modifies the events it owns in place, so the caller's event is never used directly.
+        event = element._clone()
+        if key:
+            event.key = key
+        if event_time:
+            event.time = event_time
+    else:
+        event = Event(element, key=key, time=event_time)
+    return event
+
+
+def _build_events(elements, keys, event_times, batch_awaitable_result):
+    if keys is not None and len(keys) != len(elements):
+        raise ValueError(f'Got {len(keys)} keys for {len(elements)} elements')
+    if event_times is not None and len(event_times) != len(elements):
+        raise ValueError(f'Got {len(event_times)} event times for {len(elements)} elements')
+    now = None
+    if event_times is None:
+        now = datetime.now(timezone.utc)
+    events = []
+    for i, element in enumerate(elements):
+        event = _build_event(element, keys[i] if keys is not None else None, event_times[i] if event_times is not None else now)
+        if batch_awaitable_result:
+            event._awaitable_result = _BatchAwaitableResultSlot(batch_awaitable_result, i)
+        else:
+            event._awaitable_result = None
+        events.append(event)
+    return events
+
+
 class FlowController:
-    def __init__(self, emit_fn, await_termination_fn):
+    def __init__(self, emit_fn, await_termination_fn, emit_many_fn=None):
         self._emit_fn = emit_fn
         self._await_termination_fn = await_termination_fn
+        self._emit_many_fn = emit_many_fn
 
     def emit(self, element, key=None, event_time=None, return_awaitable_result=False):
         if event_time is None:
             event_time = datetime.now(timezone.utc)
-        if hasattr(element, 'id'):
-            event = element
-            if key:
-                event.key = key
-            if event_time:
-                event.time = event_time
-        else:
-            event = Event(element, key=key, time=event_time)
+        event = _build_event(element, key, event_time)
         awaitable_result = None
         if return_awaitable_result:
             awaitable_result = AwaitableResult()
@@ -149,6 +361,15 @@ class FlowController:
         self._emit_fn(event)
         return awaitable_result
 
+    def emit_many(self, elements, keys=None, event_times=None, return_awaitable_result=False):
+        awaitable_result = None
+        if return_awaitable_result:
+            awaitable_result = BatchAwaitableResult(len(elements))
+        events = _build_events(elements, keys, event_times, awaitable_result)
+        if events:
+            self._emit_many_fn(events)
+        return awaitable_result
+
     def terminate(self):
         self._emit_fn(_termination_obj)
 
@@ -164,32 +385,107 @@ class FlowAwaiter:
         return self._await_termination_fn()
 
 
+def _set_result_if_pending(future):
+    if not future.done():
+        future.set_result(None)
+
+
+# A bounded buffer through which producer threads hand events over to an event loop. Producers append without taking a lock and only
+# synchronize when the buffer is full, while the loop side drains everything that is available in a single step.
+class _ThreadToLoopBuffer:
+    def __init__(self, capacity):
+        self._capacity = capacity
+        self._events = collections.deque()
+        self._loop = None
+        self._waiter = None
+        self._not_full = threading.Condition(threading.Lock())
+        self._blocked_producers = 0
+        self._closed = False
+
+    def put(self, event):
+        self._wait_not_full()
+        self._events.append(event)
+        self._wake_consumer()
+
+    def _wait_not_full(self):
+        if len(self._events) >= self._capacity and not self._closed:
+            with self._not_full:
+                self._blocked_producers += 1
+                try:
+                    while len(self._events) >= self._capacity and not self._closed:
+                        self._not_full.wait()
+                finally:
+                    self._blocked_producers -= 1
+
+    # Enqueues all events as one unit once there is room in the buffer, which may temporarily exceed its capacity.
+    def put_many(self, events):
+        self._wait_not_full()
+        self._events.extend(events)
+        self._wake_consumer()
+
+    def _wake_consumer(self):
+        waiter = self._waiter
+        if waiter is not None:
+            self._waiter = None
+            self._loop.call_soon_threadsafe(_set_result_if_pending, waiter)
+
+    async def get_available(self, max_count):
+        events = self._events
+        if not events:
+            self._loop = asyncio.get_running_loop()
+            waiter = self._loop.create_future()
+            self._waiter = waiter
+            # Check again in case a producer appended before it could see the waiter.
+            if not events:
+                await waiter
+            self._waiter = None
+        result = []
+        popleft = events.popleft
+        while events and len(result) < max_count:
+            result.append(popleft())
+        if self._blocked_producers:
+            with self._not_full:
+                self._not_full.notify_all()
+        return result
+
+    # Stop blocking producers, e.g. after the consumer has failed.
+    def close(self):
+        with self._not_full:
+            self._closed = True
+            self._not_full.notify_all()
+
+
 class Source(Flow):
-    def __init__(self, buffer_size=1, **kwargs):
+    def __init__(self, buffer_size=1, max_batch_size=1024, **kwargs):
         super().__init__(**kwargs)
         if buffer_size <= 0:
             raise ValueError('Buffer size must be positive')
-        self._q = queue.Queue(buffer_size)
+        if max_batch_size <= 0:
+            raise ValueError('Max batch size must be positive')
+        self._q = _ThreadToLoopBuffer(buffer_size)
+        self._max_batch_size = max_batch_size
         self._termination_q = queue.Queue(1)
         self._ex = None
 
     async def _run_loop(self):
-        loop = asyncio.get_running_loop()
         self._termination_future = asyncio.get_running_loop().create_future()
 
         while True:
-            event = await loop.run_in_executor(None, self._q.get)
+            events = await self._q.get_available(self._max_batch_size)
+            terminated = events[-1] is _termination_obj
+            if terminated:
+                events.pop()
             try:
-                termination_result = await self._do_downstream(event)
-                if event is _termination_obj:
+                await self._do_downstream_batch(events)
+                if terminated:
+                    termination_result = await self._do_downstream(_termination_obj)
                     self._termination_future.set_result(termination_result)
             except BaseException as ex:
                 self._ex = ex
-                if not self._q.empty():
-                    self._q.get()
+                self._q.close()
                 self._termination_future.set_result(None)
                 break
-            if event is _termination_obj:
+            if terminated:
                 break
 
     def _loop_thread_main(self):
@@ -200,11 +496,19 @@ class Source(Flow):
         if ex:
             raise FlowError('Flow execution terminated due to an error') from self._ex
 
+    def _outputs_owned_events(self):
+        return True
+
     def _emit(self, event):
         self._raise_on_error(self._ex)
         self._q.put(event)
         self._raise_on_error(self._ex)
 
+    def _emit_many(self, events):
+        self._raise_on_error(self._ex)
+        self._q.put_many(events)
+        self._raise_on_error(self._ex)
+
     def run(self):
         super().run()
 
@@ -215,7 +519,7 @@ class Source(Flow):
             self._raise_on_error(self._termination_q.get())
             return self._termination_future.result()
 
-        return FlowController(self._emit, raise_error_or_return_termination_result)
+        return FlowController(self._emit, raise_error_or_return_termination_result, self._emit_many)
 
 
 class AsyncAwaitableResult:
@@ -232,22 +536,38 @@ class AsyncAwaitableResult:
         await self._set_result(ex)
 
 
+class AsyncBatchAwaitableResult:
+    def __init__(self, size):
+        self._results = [None] * size
+        self._remaining = size
+        self._done = asyncio.get_running_loop().create_future()
+        if size == 0:
+            self._done.set_result(self._results)
+
+    async def await_result(self):
+        return await self._done
+
+    async def _set_result_at(self, index, element):
+        self._results[index] = element
+        self._remaining -= 1
+        if self._remaining == 0 and not self._done.done():
+            self._done.set_result(self._results)
+
+    async def _set_error(self, ex):
+        if not self._done.done():
+            self._done.set_result(ex)
+
+
 class AsyncFlowController:
-    def __init__(self, emit_fn, loop_task):
+    def __init__(self, emit_fn, loop_task, emit_many_fn=None):
         self._emit_fn = emit_fn
         self._loop_task = loop_task
+        self._emit_many_fn = emit_many_fn
 
     async def emit(self, element, key=None, event_time=None, await_result=False):
         if event_time is None:
             event_time = datetime.now(timezone.utc)
-        if hasattr(element, 'id'):
-            event = element
-            if key:
-                event.key = key
-            if event_time:
-                event = event_time
-        else:
-            event = Event(element, key=key, time=event_time)
+        event = _build_event(element, key, event_time)
         awaitable = None
         if await_result:
             awaitable = AsyncAwaitableResult()
@@ -259,6 +579,19 @@ class AsyncFlowController:
                 raise result
             return result
 
+    async def emit_many(self, elements, keys=None, event_times=None, await_result=False):
+        awaitable = None
+        if await_result:
+            awaitable = AsyncBatchAwaitableResult(len(elements))
+        events = _build_events(elements, keys, event_times, awaitable)
+        if events:
+            await self._emit_many_fn(events)
+        if await_result:
+            result = await awaitable.await_result()
+            if isinstance(result, BaseException):
+                raise result
+            return result
+
     async def terminate(self):
         await self._emit_fn(_termination_obj)
 
@@ -271,22 +604,28 @@ class AsyncSource(Flow):
         super().__init__(**kwargs)
         if buffer_size <= 0:
             raise ValueError('Buffer size must be positive')
-        self._q = asyncio.Queue(buffer_size, loop=asyncio.get_running_loop())
+        self._q = asyncio.Queue(buffer_size)
         self._ex = None
 
     async def _run_loop(self):
         while True:
-            event = await self._q.get()
+            # Each queue item is either a single event or a list of events emitted together by emit_many.
+            item = await self._q.get()
             try:
-                termination_result = await self._do_downstream(event)
-                if event is _termination_obj:
-                    return termination_result
+                if isinstance(item, list):
+                    await self._do_downstream_batch(item)
+                else:
+                    termination_result = await self._do_downstream(item)
+                    if item is _termination_obj:
+                        return termination_result
             except BaseException as ex:
                 self._ex = ex
-                if event._awaitable_result:
-                    awaitable = event._awaitable_result._set_error(ex)
-                    if awaitable:
-                        await awaitable
+                events = item if isinstance(item, list) else [item]
+                for event in events:
+                    if event._awaitable_result:
+                        awaitable = event._awaitable_result._set_error(ex)
+                        if awaitable:
+                            await awaitable
                 if not self._q.empty():
                     await self._q.get()
                 return None
@@ -295,19 +634,28 @@ class AsyncSource(Flow):
         if self._ex:
             raise FlowError('Flow execution terminated due to an error') from self._ex
 
+    def _outputs_owned_events(self):
+        return True
+
     async def _emit(self, event):
         self._raise_on_error()
         await self._q.put(event)
         self._raise_on_error()
 
+    async def _emit_many(self, events):
+        await self._emit(events)
+
     async def run(self):
         loop_task = asyncio.get_running_loop().create_task(self._run_loop())
-        return AsyncFlowController(self._emit, loop_task)
+        return AsyncFlowController(self._emit, loop_task, self._emit_many)
 
 
 class ReadCSV(Flow):
-    def __init__(self, paths, with_header=False, build_dict=False, key_field=None, timestamp_field=None, timestamp_format=None, **kwargs):
+    def __init__(self, paths, with_header=False, build_dict=False, key_field=None, timestamp_field=None, timestamp_format=None,
+                 max_batch_size=1024, **kwargs):
         super().__init__(**kwargs)
+        if max_batch_size <= 0:
+            raise ValueError('Max batch size must be positive')
         if isinstance(paths, str):
             paths = [paths]
         self._paths = paths
@@ -316,6 +664,7 @@ class ReadCSV(Flow):
         self._key_field = key_field
         self._timestamp_field = timestamp_field
         self._timestamp_format = timestamp_format
+        self._max_batch_size = max_batch_size
 
         self._termination_q = queue.Queue(1)
         self._ex = None
@@ -339,6 +688,7 @@ class ReadCSV(Flow):
                         field_name_to_index = {}
                         for i in range(len(header)):
                             field_name_to_index[header[i]] = i
+                    events = []
                     async for line in f:
                         parsed_line = next(csv.reader([line]))
                         element = parsed_line
@@ -366,13 +716,20 @@ class ReadCSV(Flow):
                                 timestamp = datetime.fromisoformat(timestamp_str)
                         else:
                             timestamp = datetime.now()
-                        await self._do_downstream(Event(element, key=key, time=timestamp))
+                        events.append(Event(element, key=key, time=timestamp))
+                        if len(events) >= self._max_batch_size:
+                            await self._do_downstream_batch(events)
+                            events = []
+                    await self._do_downstream_batch(events)
             termination_result = await self._do_downstream(_termination_obj)
             self._termination_future.set_result(termination_result)
         except BaseException as ex:
             self._ex = ex
             self._termination_future.set_result(None)
 
+    def _outputs_owned_events(self):
+        return True
+
     def _loop_thread_main(self):
         asyncio.run(self._run_loop())
         self._termination_q.put(self._ex)
@@ -394,13 +751,72 @@ class ReadCSV(Flow):
         return FlowAwaiter(raise_error_or_return_termination_result)
 
 
+# Processes events concurrently, up to max_in_flight at a time, while events that share a key are processed strictly in order.
+class _ConcurrentByKey:
+    def __init__(self, max_in_flight, process_fn):
+        if max_in_flight <= 0:
+            raise ValueError('max_in_flight_by_key must be positive')
+        self._max_in_flight = max_in_flight
+        self._process_fn = process_fn
+        self._in_flight = None
+        self._key_queues = {}
+        self._tasks = set()
+        self._ex = None
+
+    def _raise_on_error(self):
+        if self._ex:
+            raise self._ex
+
+    async def submit(self, event):
+        if self._in_flight is None:
+            self._in_flight = asyncio.Semaphore(self._max_in_flight)
+        self._raise_on_error()
+        await self._in_flight.acquire()
+        self._raise_on_error()
+        key = event.key
+        key_queue = self._key_queues.get(key)
+        if key_queue is not None:
+            key_queue.append(event)
+        else:
+            key_queue = collections.deque([event])
+            self._key_queues[key] = key_queue
+            task = asyncio.get_running_loop().create_task(self._process_key(key, key_queue))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _process_key(self, key, key_queue):
+        try:
+            while key_queue:
+                await self._process_fn(key_queue[0])
+                key_queue.popleft()
+                self._in_flight.release()
+        except BaseException as ex:
+            if self._ex is None:
+                self._ex = ex
+            for _ in key_queue:
+                self._in_flight.release()
+        finally:
+            del self._key_queues[key]
+
+    async def flush(self):
+        while self._tasks:
+            await asyncio.wait(set(self._tasks))
+        self._raise_on_error()
+
+
 class UnaryFunctionFlow(Flow):
-    def __init__(self, fn, **kwargs):
+    def __init__(self, fn, max_in_flight_by_key=None, **kwargs):
         super().__init__(**kwargs)
         if not callable(fn):
             raise TypeError(f'Expected a callable, got {type(fn)}')
         self._is_async = asyncio.iscoroutinefunction(fn)
         self._fn = fn
+        self._by_key = None
+        if max_in_flight_by_key is not None:
+            self._by_key = _ConcurrentByKey(max_in_flight_by_key, self._do_event)
+
+    def _outputs_owned_events(self):
+        return not self._full_event
 
     async def _call(self, element):
         res = self._fn(element)
@@ -408,16 +824,40 @@ class UnaryFunctionFlow(Flow):
             res = await res
         return res
 
+    async def _call_batch(self, elements):
+        if self._is_async:
+            return [await self._fn(element) for element in elements]
+        return [self._fn(element) for element in elements]
+
     async def _do_internal(self, element, fn_result):
         raise NotImplementedError()
 
+    async def _do_internal_batch(self, events, fn_results):
+        raise NotImplementedError()
+
     async def _do(self, event):
         if event is _termination_obj:
+            if self._by_key:
+                await self._by_key.flush()
             return await self._do_downstream(_termination_obj)
+        elif self._by_key:
+            await self._by_key.submit(event)
         else:
-            element = self._get_safe_event_or_body(event)
-            fn_result = await self._call(element)
-            await self._do_internal(event, fn_result)
+            await self._do_event(event)
+
+    async def _do_event(self, event):
+        element = self._get_safe_event_or_body(event)
+        fn_result = await self._call(element)
+        await self._do_internal(event, fn_result)
+
+    async def _do_batch(self, events):
+        if self._by_key:
+            for event in events:
+                await self._by_key.submit(event)
+            return
+        elements = [self._get_safe_event_or_body(event) for event in events]
+        fn_results = await self._call_batch(elements)
+        await self._do_internal_batch(events, fn_results)
 
 
 class Map(UnaryFunctionFlow):
@@ -425,33 +865,222 @@ class Map(UnaryFunctionFlow):
         mapped_event = self._user_fn_output_to_event(event, fn_result)
         await self._do_downstream(mapped_event)
 
+    async def _do_internal_batch(self, events, fn_results):
+        mapped_events = [self._user_fn_output_to_event(event, fn_result) for event, fn_result in zip(events, fn_results)]
+        await self._do_downstream_batch(mapped_events)
+
 
 class Filter(UnaryFunctionFlow):
+    def _outputs_owned_events(self):
+        return bool(self._owns_input)
+
     async def _do_internal(self, event, keep):
         if keep:
             await self._do_downstream(event)
 
+    async def _do_internal_batch(self, events, keeps):
+        await self._do_downstream_batch([event for event, keep in zip(events, keeps) if keep])
+
 
 class FlatMap(UnaryFunctionFlow):
+    # Several events are produced from each input event, so each of them must be a copy.
+    def _user_fn_output_to_event(self, event, fn_result):
+        if self._full_event:
+            return fn_result
+        return self._copy_with_body(event, fn_result)
+
     async def _do_internal(self, event, fn_result):
         for fn_result_element in fn_result:
             mapped_event = self._user_fn_output_to_event(event, fn_result_element)
             await self._do_downstream(mapped_event)
 
+    async def _do_internal_batch(self, events, fn_results):
+        mapped_events = []
+        for event, fn_result in zip(events, fn_results):
+            for fn_result_element in fn_result:
+                mapped_events.append(self._user_fn_output_to_event(event, fn_result_element))
+        await self._do_downstream_batch(mapped_events)
+
+
+class ConcurrentMap(UnaryFunctionFlow):
+    def __init__(self, fn, max_in_flight=8, ordered=True, **kwargs):
+        super().__init__(fn, **kwargs)
+        if max_in_flight <= 0:
+            raise ValueError('max_in_flight must be positive')
+        if self._by_key:
+            raise ValueError('ConcurrentMap does not support max_in_flight_by_key')
+        self._max_in_flight = max_in_flight
+        self._ordered = ordered
+        self._q = None
+
+    # In ordered mode, jobs are queued in submission order and the queue bounds the number in flight. Otherwise, a semaphore bounds
+    # the number in flight and jobs are queued as they complete.
+    async def _worker(self):
+        try:
+            while True:
+                job = await self._q.get()
+                if job is _termination_obj:
+                    break
+                event, task = job
+                fn_result = await task
+                await self._do_downstream(self._user_fn_output_to_event(event, fn_result))
+                if not self._ordered:
+                    self._in_flight.release()
+        except BaseException as ex:
+            if self._ordered:
+                if not self._q.empty():
+                    await self._q.get()
+            else:
+                self._in_flight.release()
+            raise ex
+
+    def _lazy_init(self):
+        if self._ordered:
+            self._q = asyncio.Queue(self._max_in_flight)
+        else:
+            self._q = asyncio.Queue()
+            self._in_flight = asyncio.Semaphore(self._max_in_flight)
+        self._worker_awaitable = asyncio.get_running_loop().create_task(self._worker())
+
+    async def _do(self, event):
+        if not self._q:
+            self._lazy_init()
+
+        if self._worker_awaitable.done():
+            await self._worker_awaitable
+            raise FlowError("ConcurrentMap worker has already terminated")
+
+        if event is _termination_obj:
+            if not self._ordered:
+                for _ in range(self._max_in_flight):
+                    await self._in_flight.acquire()
+                    if self._worker_awaitable.done():
+                        await self._worker_awaitable
+            await self._q.put(_termination_obj)
+            await self._worker_awaitable
+            return await self._do_downstream(_termination_obj)
+        else:
+            element = self._get_safe_event_or_body(event)
+            if self._ordered:
+                await self._q.put((event, asyncio.get_running_loop().create_task(self._call(element))))
+            else:
+                await self._in_flight.acquire()
+                if self._worker_awaitable.done():
+                    await self._worker_awaitable
+                task = asyncio.get_running_loop().create_task(self._call(element))
+                task.add_done_callback(lambda done_task: self._q.put_nowait((event, done_task)))
+            if self._worker_awaitable.done():
+                await self._worker_awaitable
+
+    async def _do_batch(self, events):
+        for event in events:
+            await self._do(event)
+
+
+def _apply_to_all(fn, elements):
+    return [fn(element) for element in elements]
+
+
+class MapInExecutor(UnaryFunctionFlow):
+    def __init__(self, fn, executor=None, max_batch_size=256, max_in_flight=4, **kwargs):
+        super().__init__(fn, **kwargs)
+        if self._is_async:
+            raise ValueError('MapInExecutor does not support async functions')
+        if self._full_event:
+            raise ValueError('MapInExecutor does not support full_event')
+        if self._by_key:
+            raise ValueError('MapInExecutor does not support max_in_flight_by_key')
+        if max_batch_size <= 0:
+            raise ValueError('Max batch size must be positive')
+        if max_in_flight <= 0:
+            raise ValueError('max_in_flight must be positive')
+        self._executor = executor
+        self._max_batch_size = max_batch_size
+        self._max_in_flight = max_in_flight
+        self._q = None
+
+    async def _worker(self):
+        try:
+            while True:
+                job = await self._q.get()
+                if job is _termination_obj:
+                    break
+                events, future = job
+                fn_results = await future
+                await self._do_downstream_batch([self._user_fn_output_to_event(event, fn_result)
+                                                 for event, fn_result in zip(events, fn_results)])
+        except BaseException as ex:
+            if not self._q.empty():
+                await self._q.get()
+            raise ex
+
+    def _lazy_init(self):
+        self._q = asyncio.Queue(self._max_in_flight)
+        self._worker_awaitable = asyncio.get_running_loop().create_task(self._worker())
+
+    async def _raise_if_worker_terminated(self):
+        if self._worker_awaitable.done():
+            await self._worker_awaitable
+            raise FlowError("MapInExecutor worker has already terminated")
+
+    async def _do(self, event):
+        if event is _termination_obj:
+            if not self._q:
+                self._lazy_init()
+            await self._raise_if_worker_terminated()
+            await self._q.put(_termination_obj)
+            await self._worker_awaitable
+            return await self._do_downstream(_termination_obj)
+        else:
+            await self._do_batch([event])
+
+    # Each batch handed to the executor is at most max_batch_size long, but may be shorter since batches are never held back waiting
+    # for more events.
+    async def _do_batch(self, events):
+        if not self._q:
+            self._lazy_init()
+        loop = asyncio.get_running_loop()
+        for i in range(0, len(events), self._max_batch_size):
+            await self._raise_if_worker_terminated()
+            batch = events[i:i + self._max_batch_size]
+            elements = [event.body for event in batch]
+            future = loop.run_in_executor(self._executor, _apply_to_all, self._fn, elements)
+            await self._q.put((batch, future))
+
 
 class FunctionWithStateFlow(Flow):
-    def __init__(self, initial_state, fn, **kwargs):
+    def __init__(self, initial_state, fn, max_in_flight_by_key=None, **kwargs):
         super().__init__(**kwargs)
         if not callable(fn):
             raise TypeError(f'Expected a callable, got {type(fn)}')
         self._is_async = asyncio.iscoroutinefunction(fn)
         self._state = initial_state
         self._fn = fn
-
-    async def _call(self, element):
-        res, self._state = self._fn(element, self._state)
+        self._by_key = None
+        self._states_by_key = None
+        # Events with different keys are processed concurrently, so each key gets its own copy of the initial state.
+        if max_in_flight_by_key is not None:
+            self._by_key = _ConcurrentByKey(max_in_flight_by_key, self._do_event)
+            self._states_by_key = {}
+
+    def _outputs_owned_events(self):
+        return not self._full_event
+
+    async def _call(self, element, key):
+        if self._states_by_key is None:
+            state = self._state
+        elif key in self._states_by_key:
+            state = self._states_by_key[key]
+        else:
+            state = copy.deepcopy(self._state)
         if self._is_async:
-            res = await res
+            res, state = await self._fn(element, state)
+        else:
+            res, state = self._fn(element, state)
+        if self._states_by_key is None:
+            self._state = state
+        else:
+            self._states_by_key[key] = state
         return res
 
     async def _do_internal(self, element, fn_result):
@@ -459,11 +1088,26 @@ class FunctionWithStateFlow(Flow):
 
     async def _do(self, event):
         if event is _termination_obj:
+            if self._by_key:
+                await self._by_key.flush()
             return await self._do_downstream(_termination_obj)
+        elif self._by_key:
+            await self._by_key.submit(event)
         else:
-            element = self._get_safe_event_or_body(event)
-            fn_result = await self._call(element)
-            await self._do_internal(event, fn_result)
+            await self._do_event(event)
+
+    async def _do_event(self, event):
+        element = self._get_safe_event_or_body(event)
+        fn_result = await self._call(element, event.key)
+        await self._do_internal(event, fn_result)
+
+    async def _do_batch(self, events):
+        if self._by_key:
+            for event in events:
+                await self._by_key.submit(event)
+            return
+        fn_results = [await self._call(self._get_safe_event_or_body(event), event.key) for event in events]
+        await self._do_internal_batch(events, fn_results)
 
 
 class MapWithState(FunctionWithStateFlow):
@@ -471,6 +1115,10 @@ class MapWithState(FunctionWithStateFlow):
         mapped_event = self._user_fn_output_to_event(event, mapped_element)
         await self._do_downstream(mapped_event)
 
+    async def _do_internal_batch(self, events, mapped_elements):
+        mapped_events = [self._user_fn_output_to_event(event, mapped_element) for event, mapped_element in zip(events, mapped_elements)]
+        await self._do_downstream_batch(mapped_events)
+
 
 class Complete(Flow):
     async def _do(self, event):
@@ -482,6 +1130,14 @@ class Complete(Flow):
                 await res
         return termination_result
 
+    async def _do_batch(self, events):
+        await self._do_downstream_batch(events)
+        for event in events:
+            result = self._get_safe_event_or_body(event)
+            res = event._awaitable_result._set_result(result)
+            if res:
+                await res
+
 
 class Reduce(Flow):
     def __init__(self, initial_value, fn, **kwargs):
@@ -508,6 +1164,173 @@ class Reduce(Flow):
                 res = await res
             self._result = res
 
+    async def _do_batch(self, events):
+        if self._full_event:
+            elements = events
+        else:
+            elements = [event.body for event in events]
+        result = self._result
+        if self._is_async:
+            for element in elements:
+                result = await self._fn(result, element)
+        else:
+            for element in elements:
+                result = self._fn(result, element)
+        self._result = result
+
+
+# Sends the events that reach the leaves of a partition's sub-flow back to the parent process.
+class _SendToParent(Flow):
+    def __init__(self, out_q):
+        super().__init__()
+        self._out_q = out_q
+
+    async def _do(self, event):
+        if event is not _termination_obj:
+            await self._do_batch([event])
+
+    async def _do_batch(self, events):
+        self._out_q.put(pickle.dumps(('events', [(event.body, event.key, event.time) for event in events])))
+
+
+def _flow_leaves(head):
+    leaves = []
+    visited = set()
+    to_visit = [head]
+    while to_visit:
+        step = to_visit.pop()
+        if id(step) in visited:
+            continue
+        visited.add(id(step))
+        if step._outlets:
+            to_visit.extend(step._outlets)
+        else:
+            leaves.append(step)
+    return leaves
+
+
+def _partition_worker_main(subflow, in_q, out_q):
+    try:
+        head = subflow()
+        source = Source()
+        source.to(head)
+        send_to_parent = _SendToParent(out_q)
+        for leaf in _flow_leaves(head):
+            try:
+                leaf.to(send_to_parent)
+            except ValueError:  # Terminal steps such as Reduce
+                pass
+        controller = source.run()
+        while True:
+            batch = pickle.loads(in_q.get())
+            if batch is None:
+                break
+            bodies = [body for body, _, _ in batch]
+            keys = [key for _, key, _ in batch]
+            event_times = [time for _, _, time in batch]
+            controller.emit_many(bodies, keys, event_times)
+        controller.terminate()
+        out_q.put(pickle.dumps(('done', controller.await_termination())))
+    except BaseException as ex:
+        if isinstance(ex, FlowError) and ex.__cause__:
+            ex = ex.__cause__
+        try:
+            message = pickle.dumps(('error', ex))
+        except Exception:
+            message = pickle.dumps(('error', FlowError(repr(ex))))
+        out_q.put(message)
+
+
+class PartitionByKey(Flow):
+    def __init__(self, n_workers, subflow, max_in_flight=4, mp_context='spawn', **kwargs):
+        super().__init__(**kwargs)
+        if n_workers <= 0:
+            raise ValueError('Number of workers must be positive')
+        if not callable(subflow):
+            raise TypeError(f'Expected a callable, got {type(subflow)}')
+        if max_in_flight <= 0:
+            raise ValueError('max_in_flight must be positive')
+        self._n_workers = n_workers
+        self._subflow = subflow
+        self._max_in_flight = max_in_flight
+        self._mp_context = mp_context
+        self._processes = None
+
+    def _outputs_owned_events(self):
+        return True
+
+    def _lazy_init(self):
+        context = multiprocessing.get_context(self._mp_context)
+        self._out_q = context.Queue()
+        self._in_qs = []
+        self._processes = []
+        for _ in range(self._n_workers):
+            in_q = context.Queue(self._max_in_flight)
+            process = context.Process(target=_partition_worker_main, args=(self._subflow, in_q, self._out_q), daemon=True)
+            process.start()
+            self._in_qs.append(in_q)
+            self._processes.append(process)
+        self._reader_awaitable = asyncio.get_running_loop().create_task(self._reader())
+
+    # Forwards the outputs of all partitions downstream, and returns their termination results once they all terminate.
+    async def _reader(self):
+        loop = asyncio.get_running_loop()
+        termination_results = []
+        try:
+            while len(termination_results) < self._n_workers:
+                kind, payload = pickle.loads(await loop.run_in_executor(None, self._out_q.get))
+                if kind == 'events':
+                    await self._do_downstream_batch([Event(body, key=key, time=time) for body, key, time in payload])
+                elif kind == 'done':
+                    termination_results.append(payload)
+                else:
+                    raise payload
+        except BaseException:
+            for process in self._processes:
+                process.terminate()
+            raise
+        return termination_results
+
+    async def _raise_if_reader_terminated(self):
+        if self._reader_awaitable.done():
+            await self._reader_awaitable
+            raise FlowError("PartitionByKey reader has already terminated")
+
+    async def _send(self, partition, batch):
+        await asyncio.get_running_loop().run_in_executor(None, self._in_qs[partition].put, pickle.dumps(batch))
+
+    async def _do(self, event):
+        if not self._processes:
+            self._lazy_init()
+        if event is _termination_obj:
+            await self._raise_if_reader_terminated()
+            for partition in range(self._n_workers):
+                await self._send(partition, None)
+            try:
+                termination_results = await self._reader_awaitable
+            finally:
+                for process in self._processes:
+                    process.join()
+            termination_result = termination_results[0]
+            for i in range(1, len(termination_results)):
+                termination_result = self._termination_result_fn(termination_result, termination_results[i])
+            if self._outlets:
+                termination_result = self._termination_result_fn(termination_result, await self._do_downstream(_termination_obj))
+            return termination_result
+        else:
+            await self._do_batch([event])
+
+    async def _do_batch(self, events):
+        if not self._processes:
+            self._lazy_init()
+        await self._raise_if_reader_terminated()
+        batches = [[] for _ in range(self._n_workers)]
+        for event in events:
+            batches[hash(event.key) % self._n_workers].append((event.body, event.key, event.time))
+        for partition, batch in enumerate(batches):
+            if batch:
+                await self._send(partition, batch)
+
 
 class NeedsV3ioAccess:
     def __init__(self, webapi=None, access_key=None):
@@ -577,14 +1400,28 @@ class HttpResponse:
 
 
 class JoinWithHttp(Flow):
-    def __init__(self, request_builder, join_from_response, max_in_flight=8, **kwargs):
+    def __init__(self, request_builder, join_from_response, max_in_flight=8, max_in_flight_by_key=None, **kwargs):
         Flow.__init__(self, **kwargs)
         self._request_builder = request_builder
         self._join_from_response = join_from_response
         self._max_in_flight = max_in_flight
+        self._by_key = None
+        if max_in_flight_by_key is not None:
+            self._by_key = _ConcurrentByKey(max_in_flight_by_key, self._do_event)
 
         self._client_session = None
 
+    def _send_request(self, event):
+        req = self._request_builder(event)
+        return self._client_session.request(req.method, req.url, headers=req.headers, data=req.body, ssl=False)
+
+    async def _join_and_forward(self, event, response):
+        response_body = await response.text()
+        joined_element = self._join_from_response(event.body, HttpResponse(response.status, response_body))
+        if joined_element is not None:
+            new_event = self._user_fn_output_to_event(event, joined_element)
+            await self._do_downstream(new_event)
+
     async def _worker(self):
         try:
             while True:
@@ -594,11 +1431,7 @@ class JoinWithHttp(Flow):
                 event = job[0]
                 request = job[1]
                 response = await request
-                response_body = await response.text()
-                joined_element = self._join_from_response(event.body, HttpResponse(response.status, response_body))
-                if joined_element is not None:
-                    new_event = self._user_fn_output_to_event(event, joined_element)
-                    await self._do_downstream(new_event)
+                await self._join_and_forward(event, response)
         except BaseException as ex:
             if not self._q.empty():
                 await self._q.get()
@@ -606,16 +1439,34 @@ class JoinWithHttp(Flow):
         finally:
             await self._client_session.close()
 
+    async def _do_event(self, event):
+        response = await self._send_request(event)
+        await self._join_and_forward(event, response)
+
     def _lazy_init(self):
         connector = aiohttp.TCPConnector()
         self._client_session = aiohttp.ClientSession(connector=connector)
-        self._q = asyncio.queues.Queue(self._max_in_flight)
-        self._worker_awaitable = asyncio.get_running_loop().create_task(self._worker())
+        if not self._by_key:
+            self._q = asyncio.queues.Queue(self._max_in_flight)
+            self._worker_awaitable = asyncio.get_running_loop().create_task(self._worker())
+
+    async def _do_by_key(self, event):
+        if event is _termination_obj:
+            try:
+                await self._by_key.flush()
+            finally:
+                await self._client_session.close()
+            return await self._do_downstream(_termination_obj)
+        else:
+            await self._by_key.submit(event)
 
     async def _do(self, event):
         if not self._client_session:
             self._lazy_init()
 
+        if self._by_key:
+            return await self._do_by_key(event)
+
         if self._worker_awaitable.done():
             await self._worker_awaitable
             raise FlowError("JoinWithHttp worker has already terminated")
@@ -625,8 +1476,7 @@ class JoinWithHttp(Flow):
             await self._worker_awaitable
             return await self._do_downstream(_termination_obj)
         else:
-            req = self._request_builder(event)
-            request = self._client_session.request(req.method, req.url, headers=req.headers, data=req.body, ssl=False)
+            request = self._send_request(event)
             await self._q.put((event, asyncio.get_running_loop().create_task(request)))
             if self._worker_awaitable.done():
                 await self._worker_awaitable
@@ -19,6 +19,9 @@ class Window(Flow):
         self._emit_worker_running = False
         self._terminate_worker = False
 
+    def _outputs_owned_events(self):
+        return True
+
     async def _emit_worker(self):
         while not self._terminate_worker:
             if isinstance(self._emit_policy, EmitAfterPeriod):
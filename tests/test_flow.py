@@ -1,7 +1,12 @@
 import asyncio
+import copy
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import threading
+import time
 from datetime import datetime
 
-from storey import build_flow, Source, Map, Filter, FlatMap, Reduce, FlowError, MapWithState, ReadCSV, Complete, AsyncSource, Choice, Event
+from storey import build_flow, Source, Map, Filter, FlatMap, Reduce, FlowError, MapWithState, ReadCSV, Complete, AsyncSource, Choice, \
+    Event, Flow, ConcurrentMap, MapInExecutor, PartitionByKey
 
 
 class ATestException(Exception):
@@ -38,6 +43,65 @@ def test_functional_flow():
     assert termination_result == 3300
 
 
+def test_functional_flow_batched():
+    controller = build_flow([
+        Source(buffer_size=100, max_batch_size=7),
+        Map(lambda x: x + 1),
+        Filter(lambda x: x < 3),
+        FlatMap(lambda x: [x, x * 10]),
+        MapWithState(0, lambda x, state: (x + state, state)),
+        Reduce(0, lambda acc, x: acc + x),
+    ]).run()
+
+    for _ in range(100):
+        for i in range(10):
+            controller.emit(i)
+    controller.terminate()
+    termination_result = controller.await_termination()
+    assert termination_result == 3300
+
+
+def test_emit_from_many_threads():
+    controller = build_flow([
+        Source(buffer_size=64),
+        Map(lambda x: x + 1),
+        Reduce(0, lambda acc, x: acc + x),
+    ]).run()
+
+    def emit_range(start):
+        for i in range(start, start + 1000):
+            controller.emit(i)
+
+    threads = [threading.Thread(target=emit_range, args=(i * 1000,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    controller.terminate()
+    termination_result = controller.await_termination()
+    assert termination_result == sum(range(1, 8001))
+
+
+class PassThrough(Flow):
+    async def _do(self, event):
+        return await self._do_downstream(event)
+
+
+def test_batch_falls_back_to_do():
+    controller = build_flow([
+        Source(buffer_size=100),
+        Map(lambda x: x * 2),
+        PassThrough(),
+        Reduce(0, lambda acc, x: acc + x),
+    ]).run()
+
+    for i in range(100):
+        controller.emit(i)
+    controller.terminate()
+    termination_result = controller.await_termination()
+    assert termination_result == 9900
+
+
 def test_csv_reader():
     controller = build_flow([
         ReadCSV('tests/test.csv', with_header=True),
@@ -50,6 +114,18 @@ def test_csv_reader():
     assert termination_result == 21
 
 
+def test_csv_reader_small_batches():
+    controller = build_flow([
+        ReadCSV('tests/test.csv', with_header=True, max_batch_size=1),
+        FlatMap(lambda x: x),
+        Map(lambda x: int(x)),
+        Reduce(0, lambda acc, x: acc + x),
+    ]).run()
+
+    termination_result = controller.await_termination()
+    assert termination_result == 21
+
+
 def test_csv_reader_as_dict():
     controller = build_flow([
         ReadCSV('tests/test.csv', with_header=True, build_dict=True),
@@ -175,6 +251,61 @@ def test_broadcast_complex():
     assert termination_result == 3303
 
 
+async def async_multiply_by_100(x):
+    await asyncio.sleep(0)
+    return x * 100
+
+
+def test_broadcast_with_suspending_outlet():
+    controller = build_flow([
+        Source(),
+        Map(lambda x: x + 1),
+        Filter(lambda x: x < 3, termination_result_fn=lambda x, y: x + y),
+        [
+            Reduce(0, lambda acc, x: acc + x),
+        ],
+        [
+            Map(async_multiply_by_100),
+            Reduce(0, lambda acc, x: acc + x)
+        ],
+        [
+            Map(lambda x: x * 1000),
+            Reduce(0, lambda acc, x: acc + x)
+        ]
+    ]).run()
+
+    for i in range(10):
+        controller.emit(i)
+    controller.terminate()
+    termination_result = controller.await_termination()
+    assert termination_result == 3303
+
+
+def test_broadcast_error_in_suspending_outlet():
+    async def async_raise(x):
+        await asyncio.sleep(0)
+        raise ATestException('test')
+
+    controller = build_flow([
+        Source(),
+        [
+            Reduce(0, lambda acc, x: acc + x),
+        ],
+        [
+            Map(async_raise),
+            Reduce(0, lambda acc, x: acc + x)
+        ]
+    ]).run()
+
+    try:
+        controller.emit(1)
+        controller.terminate()
+        controller.await_termination()
+        assert False
+    except FlowError as flow_ex:
+        assert isinstance(flow_ex.__cause__, ATestException)
+
+
 # Same as test_broadcast_complex but without using build_flow
 def test_broadcast_complex_no_sugar():
     source = Source()
@@ -226,6 +357,87 @@ def test_awaitable_result():
     assert termination_result == 55
 
 
+def test_emit_many():
+    controller = build_flow([
+        Source(buffer_size=4),
+        Map(lambda x: x + 1),
+        Reduce(0, lambda acc, x: acc + x),
+    ]).run()
+
+    for i in range(10):
+        controller.emit_many(list(range(i * 100, (i + 1) * 100)))
+    controller.terminate()
+    termination_result = controller.await_termination()
+    assert termination_result == sum(range(1, 1001))
+
+
+def test_emit_many_with_keys_and_times():
+    controller = build_flow([
+        Source(),
+        Reduce([], append_and_return, full_event=True),
+    ]).run()
+
+    times = [datetime(2020, 2, 15, 2, i) for i in range(3)]
+    controller.emit_many(['a', 'b', 'c'], keys=['k1', 'k2', 'k3'], event_times=times)
+    controller.terminate()
+    termination_result = controller.await_termination()
+    assert [event.body for event in termination_result] == ['a', 'b', 'c']
+    assert [event.key for event in termination_result] == ['k1', 'k2', 'k3']
+    assert [event.time for event in termination_result] == times
+
+
+def test_emit_many_mismatched_keys():
+    controller = build_flow([
+        Source(),
+        Reduce(0, lambda acc, x: acc + x),
+    ]).run()
+
+    try:
+        controller.emit_many([1, 2, 3], keys=['a'])
+        assert False
+    except ValueError:
+        pass
+    controller.terminate()
+    assert controller.await_termination() == 0
+
+
+def test_emit_many_awaitable_result():
+    controller = build_flow([
+        Source(),
+        Map(lambda x: x * 2),
+        Complete(),
+    ]).run()
+
+    awaitable_result = controller.emit_many(list(range(10)), return_awaitable_result=True)
+    assert awaitable_result.await_result() == [i * 2 for i in range(10)]
+    controller.terminate()
+    controller.await_termination()
+
+
+async def async_test_async_source_emit_many():
+    controller = await build_flow([
+        AsyncSource(),
+        Map(lambda x: x + 1, termination_result_fn=lambda _, x: x),
+        [
+            Complete()
+        ],
+        [
+            Reduce(0, lambda acc, x: acc + x)
+        ]
+    ]).run()
+
+    result = await controller.emit_many(list(range(10)), await_result=True)
+    assert result == list(range(1, 11))
+    await controller.terminate()
+    termination_result = await controller.await_termination()
+    assert termination_result == 55
+
+
+def test_async_source_emit_many():
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(async_test_async_source_emit_many())
+
+
 async def async_test_async_source():
     controller = await build_flow([
         AsyncSource(),
@@ -338,3 +550,315 @@ def test_metadata_immutability():
     assert event.body == 'original body'
     assert result.key == 'new key'
     assert result.body == 'new body'
+
+
+def test_event_lazy_id_and_time():
+    event = Event('body', key='key')
+    clone = event._clone()
+    clone.body = 'other body'
+    assert clone.id == event.id
+    assert clone.time == event.time
+    assert event.body == 'body'
+    assert not hasattr(event, '__dict__')
+
+    event = Event('body', id='my-id', time=datetime(2020, 2, 15, 2, 0))
+    clone = copy.copy(event)
+    assert clone.id == 'my-id'
+    assert clone.time == datetime(2020, 2, 15, 2, 0)
+
+
+def test_copy_elision_in_linear_chain():
+    first_map = Map(lambda x: x + 1)
+    second_map = Map(lambda x: x * 10)
+    broadcasting_map = Map(lambda x: x - 1)
+    first_branch_map = Map(lambda x: x * 2)
+    second_branch_map = Map(lambda x: x * 3)
+    controller = build_flow([
+        Source(),
+        first_map,
+        second_map,
+        broadcasting_map,
+        [
+            first_branch_map,
+            Reduce([], append_and_return),
+        ],
+        [
+            second_branch_map,
+            Reduce([], append_and_return),
+        ]
+    ]).run()
+
+    assert first_map._owns_input
+    assert second_map._owns_input
+    assert broadcasting_map._owns_input
+    assert not first_branch_map._owns_input
+    assert not second_branch_map._owns_input
+
+    for i in range(3):
+        controller.emit(i)
+    controller.terminate()
+    controller.await_termination()
+
+
+def test_copy_elision_keeps_events_isolated():
+    def add_key(event):
+        event.key = 'mapped'
+        return event
+
+    controller = build_flow([
+        Source(),
+        Map(lambda x: x + 1, termination_result_fn=lambda x, y: x + y),
+        [
+            Map(lambda x: x * 100),
+            Map(add_key, full_event=True),
+            Reduce([], append_and_return, full_event=True),
+        ],
+        [
+            Reduce([], append_and_return, full_event=True),
+        ]
+    ]).run()
+
+    for i in range(3):
+        controller.emit(Event(i, key='original'))
+    controller.terminate()
+    termination_result = controller.await_termination()
+    assert [(event.body, event.key) for event in termination_result] == \
+        [(100, 'mapped'), (200, 'mapped'), (300, 'mapped'), (1, 'original'), (2, 'original'), (3, 'original')]
+
+
+async def sleep_and_return(x):
+    await asyncio.sleep(0.01 * (x % 5))
+    return x
+
+
+def test_concurrent_map_ordered():
+    controller = build_flow([
+        Source(),
+        ConcurrentMap(sleep_and_return, max_in_flight=10),
+        Reduce([], append_and_return),
+    ]).run()
+
+    start = time.monotonic()
+    for i in range(50):
+        controller.emit(i)
+    controller.terminate()
+    termination_result = controller.await_termination()
+    assert termination_result == list(range(50))
+    assert time.monotonic() - start < 50 * 0.02
+
+
+def test_concurrent_map_unordered():
+    controller = build_flow([
+        Source(buffer_size=50),
+        ConcurrentMap(sleep_and_return, max_in_flight=10, ordered=False),
+        Reduce([], append_and_return),
+    ]).run()
+
+    for i in range(50):
+        controller.emit(i)
+    controller.terminate()
+    termination_result = controller.await_termination()
+    assert sorted(termination_result) == list(range(50))
+    assert termination_result != list(range(50))
+
+
+def test_concurrent_map_error():
+    async def raise_on_3(x):
+        await asyncio.sleep(0)
+        if x == 3:
+            raise ATestException('test')
+        return x
+
+    for ordered in [True, False]:
+        controller = build_flow([
+            Source(),
+            ConcurrentMap(raise_on_3, max_in_flight=2, ordered=ordered),
+            Reduce(0, lambda acc, x: acc + x),
+        ]).run()
+
+        try:
+            for i in range(100):
+                controller.emit(i)
+            controller.terminate()
+            controller.await_termination()
+            assert False
+        except FlowError as flow_ex:
+            assert isinstance(flow_ex.__cause__, ATestException)
+
+
+def test_map_concurrent_by_key():
+    active_by_key = {}
+    max_active = [0]
+
+    async def track_concurrency(event):
+        active_by_key[event.key] = active_by_key.get(event.key, 0) + 1
+        assert active_by_key[event.key] == 1
+        max_active[0] = max(max_active[0], sum(active_by_key.values()))
+        await asyncio.sleep(0.001 * (event.body % 3))
+        active_by_key[event.key] -= 1
+        return event
+
+    controller = build_flow([
+        Source(buffer_size=100),
+        Map(track_concurrency, full_event=True, max_in_flight_by_key=4),
+        Reduce([], append_and_return, full_event=True),
+    ]).run()
+
+    for i in range(100):
+        controller.emit(i, key=f'key{i % 5}')
+    controller.terminate()
+    termination_result = controller.await_termination()
+
+    assert len(termination_result) == 100
+    assert 1 < max_active[0] <= 4
+    for key_index in range(5):
+        bodies = [event.body for event in termination_result if event.key == f'key{key_index}']
+        assert bodies == list(range(key_index, 100, 5))
+
+
+def test_map_with_state_concurrent_by_key():
+    async def count_per_key(x, state):
+        await asyncio.sleep(0)
+        return (x, state + 1), state + 1
+
+    controller = build_flow([
+        Source(),
+        MapWithState(0, count_per_key, max_in_flight_by_key=2),
+        Reduce([], append_and_return),
+    ]).run()
+
+    for i in range(9):
+        controller.emit(i, key=i % 3)
+    controller.terminate()
+    termination_result = controller.await_termination()
+    assert sorted(termination_result) == [(i, i // 3 + 1) for i in range(9)]
+
+
+def test_map_concurrent_by_key_error():
+    async def raise_on_3(x):
+        await asyncio.sleep(0)
+        if x == 3:
+            raise ATestException('test')
+        return x
+
+    controller = build_flow([
+        Source(),
+        Map(raise_on_3, max_in_flight_by_key=2),
+        Reduce(0, lambda acc, x: acc + x),
+    ]).run()
+
+    try:
+        for i in range(100):
+            controller.emit(i, key=i % 2)
+        controller.terminate()
+        controller.await_termination()
+        assert False
+    except FlowError as flow_ex:
+        assert isinstance(flow_ex.__cause__, ATestException)
+
+
+def test_map_in_thread_pool():
+    with ThreadPoolExecutor(4) as executor:
+        controller = build_flow([
+            Source(buffer_size=100),
+            MapInExecutor(lambda x: x * 2, executor=executor, max_batch_size=7, max_in_flight=3),
+            Reduce([], append_and_return),
+        ]).run()
+
+        for i in range(1000):
+            controller.emit(i)
+        controller.terminate()
+        termination_result = controller.await_termination()
+    assert termination_result == [i * 2 for i in range(1000)]
+
+
+def test_map_in_process_pool():
+    with ProcessPoolExecutor(2) as executor:
+        controller = build_flow([
+            Source(buffer_size=100),
+            MapInExecutor(abs, executor=executor),
+            Reduce([], append_and_return),
+        ]).run()
+
+        controller.emit_many([-i for i in range(100)])
+        controller.terminate()
+        termination_result = controller.await_termination()
+    assert termination_result == list(range(100))
+
+
+def test_map_in_executor_error():
+    controller = build_flow([
+        Source(),
+        MapInExecutor(RaiseEx(50).raise_ex),
+        Reduce(0, lambda acc, x: acc + x),
+    ]).run()
+
+    try:
+        for i in range(100):
+            controller.emit(i)
+        controller.terminate()
+        controller.await_termination()
+        assert False
+    except FlowError as flow_ex:
+        assert isinstance(flow_ex.__cause__, ATestException)
+
+
+def sum_subflow():
+    return Reduce(0, lambda acc, x: acc + x)
+
+
+def count_by_key_subflow():
+    return build_flow([
+        MapWithState({}, lambda x, state: (x, state)),
+        Map(lambda x: x * 2),
+    ])
+
+
+def raising_subflow():
+    return Map(RaiseEx(5).raise_ex)
+
+
+def test_partition_by_key():
+    controller = build_flow([
+        Source(buffer_size=100),
+        PartitionByKey(3, sum_subflow, termination_result_fn=lambda x, y: x + y),
+    ]).run()
+
+    for i in range(100):
+        controller.emit(i, key=f'key{i % 7}')
+    controller.terminate()
+    termination_result = controller.await_termination()
+    assert termination_result == sum(range(100))
+
+
+def test_partition_by_key_merges_outputs():
+    controller = build_flow([
+        Source(buffer_size=100),
+        PartitionByKey(2, count_by_key_subflow, termination_result_fn=lambda _, y: y),
+        Reduce([], append_and_return, full_event=True),
+    ]).run()
+
+    for i in range(20):
+        controller.emit(i, key=i % 4)
+    controller.terminate()
+    termination_result = controller.await_termination()
+    assert sorted((event.key, event.body) for event in termination_result) == sorted((i % 4, i * 2) for i in range(20))
+    for key in range(4):
+        bodies = [event.body for event in termination_result if event.key == key]
+        assert bodies == sorted(bodies)
+
+
+def test_partition_by_key_error():
+    controller = build_flow([
+        Source(),
+        PartitionByKey(2, raising_subflow),
+    ]).run()
+
+    try:
+        for i in range(100):
+            controller.emit(i, key=0)
+        controller.terminate()
+        controller.await_termination()
+        assert False
+    except FlowError as flow_ex:
+        assert isinstance(flow_ex.__cause__, ATestException)